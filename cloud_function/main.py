@@ -1,23 +1,142 @@
 import os
 import logging
+import threading
+from typing import Any, Tuple
+import fastjsonschema
+import orjson
 from flask import Flask, request, jsonify
-from google.cloud import secretmanager
+from flask.json.provider import DefaultJSONProvider
 import json
 
 from src.data_processor import DataProcessor
+from src.bigquery_manager import BigQueryManager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider that (de)serializes request and response bodies with orjson"""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(
+            obj,
+            default=self.default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        ).decode()
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 
-def get_secret(secret_name: str, project_id: str) -> str:
-    """Retrieve secret from Google Secret Manager"""
-    client = secretmanager.SecretManagerServiceClient()
-    name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
-    response = client.access_secret_version(request={"name": name})
-    return response.payload.data.decode("UTF-8")
+DATASET_ID = "personal_finance"
+BUCKET_NAME = "personal-finance-dashboard"
+MAX_FILE_WORKERS = 32
+
+# Predefined category taxonomy as (general_category, detailed_category) pairs
+_CATEGORIES_TAXONOMY: Tuple[Tuple[str, str], ...] = (
+    ("Groceries", "Supermarkets"),
+    ("Groceries", "Convenience Stores"),
+    ("Groceries", "Specialty Food Stores"),
+    ("Dining & Restaurants", "Coffee Shops"),
+    ("Dining & Restaurants", "Fast Food"),
+    ("Dining & Restaurants", "Takeout & Delivery"),
+    ("Dining & Restaurants", "Sit-down Restaurants"),
+    ("Shopping", "Clothing"),
+    ("Shopping", "Electronics"),
+    ("Shopping", "Online Retail"),
+    ("Shopping", "Department Stores"),
+    ("Shopping", "Gifts"),
+    ("Shopping", "Beauty & Cosmetics"),
+    ("Personal Care", "Salons & Spas"),
+    ("Personal Care", "Barbershops"),
+    ("Personal Care", "Skincare & Grooming"),
+    ("Housing & Utilities", "Rent / Mortgage"),
+    ("Housing & Utilities", "Electricity"),
+    ("Housing & Utilities", "Water"),
+    ("Housing & Utilities", "Gas"),
+    ("Housing & Utilities", "Internet"),
+    ("Housing & Utilities", "Phone"),
+    ("Housing & Utilities", "Trash & Recycling"),
+    ("Housing & Utilities", "Home Supplies & Repairs"),
+    ("Transportation", "Gas & Fuel"),
+    ("Transportation", "Rideshare"),
+    ("Transportation", "Public Transit"),
+    ("Transportation", "Parking"),
+    ("Transportation", "Tolls"),
+    ("Transportation", "Vehicle Maintenance"),
+    ("Transportation", "Car Insurance"),
+    ("Financial", "Credit Card Payments"),
+    ("Financial", "Bank Fees"),
+    ("Financial", "Investments"),
+    ("Financial", "Interest / Dividends"),
+    ("Financial", "Loan Payments"),
+    ("Financial", "RRSP/TFSA Contributions"),
+    ("Health & Wellness", "Pharmacy"),
+    ("Health & Wellness", "Medical & Dental"),
+    ("Health & Wellness", "Health Insurance"),
+    ("Health & Wellness", "Gym / Fitness"),
+    ("Health & Wellness", "Sports"),
+    ("Lifestyle & Entertainment", "Streaming Services"),
+    ("Lifestyle & Entertainment", "Movies & Events"),
+    ("Lifestyle & Entertainment", "Travel"),
+    ("Lifestyle & Entertainment", "Airbnb"),
+    ("Lifestyle & Entertainment", "Subscriptions & Hobbies"),
+    ("Lifestyle & Entertainment", "Vacation Spending"),
+    ("Education", "Tuition"),
+    ("Education", "Online Courses"),
+    ("Education", "Books & Materials"),
+    ("Income & Transfers", "Salary / Paycheck"),
+    ("Income & Transfers", "Cash Back / Rewards"),
+    ("Income & Transfers", "Internal Transfers"),
+    ("Income & Transfers", "Refunds & Reimbursements"),
+    ("Work & Business", "Business Travel"),
+    ("Work & Business", "Meals"),
+    ("Work & Business", "Contractor Income"),
+    ("Work & Business", "Software / Tools"),
+    ("Uncategorized", "Uncategorized"),
+)
+
+# Compiled validator for /process-data payloads
+_validate_process_request = fastjsonschema.compile({
+    "type": "object",
+    "required": ["institution", "file_paths"],
+    "properties": {
+        "institution": {"enum": ["amex", "wealthsimple"]},
+        "file_paths": {"type": "array", "items": {"type": "string"}},
+        "force_reprocess": {"type": "boolean"},
+        "auth_token": {"type": "string"}
+    }
+})
+
+# Per-project components reused across requests handled by this container
+_PROCESSORS = {}
+_BQ_MANAGERS = {}
+_COMPONENTS_LOCK = threading.Lock()
+
+def get_data_processor(project_id: str) -> DataProcessor:
+    """Return the container-wide DataProcessor for a project"""
+    with _COMPONENTS_LOCK:
+        processor = _PROCESSORS.get(project_id)
+        if processor is None:
+            processor = DataProcessor(
+                project_id=project_id,
+                dataset_id=DATASET_ID,
+                bucket_name=BUCKET_NAME
+            )
+            _PROCESSORS[project_id] = processor
+        return processor
+
+def get_bq_manager(project_id: str) -> BigQueryManager:
+    """Return the container-wide BigQueryManager for a project"""
+    with _COMPONENTS_LOCK:
+        bq_manager = _BQ_MANAGERS.get(project_id)
+        if bq_manager is None:
+            bq_manager = BigQueryManager(project_id, DATASET_ID)
+            _BQ_MANAGERS[project_id] = bq_manager
+        return bq_manager
 
 @app.route('/process-data', methods=['POST'])
 def process_data():
@@ -39,11 +158,11 @@ def process_data():
         
         data = request.get_json()
         
-        # Basic validation
-        required_fields = ["institution", "file_paths"]
-        for field in required_fields:
-            if field not in data:
-                return jsonify({"error": f"Missing required field: {field}"}), 400
+        # Validate payload against the request schema
+        try:
+            _validate_process_request(data)
+        except fastjsonschema.JsonSchemaException as e:
+            return jsonify({"error": f"Invalid request: {e.message}"}), 400
         
         # TODO: Validate auth_token here
         
@@ -52,17 +171,14 @@ def process_data():
         if not project_id:
             return jsonify({"error": "GCP_PROJECT_ID environment variable not set"}), 500
         
-        processor = DataProcessor(
-            project_id=project_id,
-            dataset_id="personal_finance",
-            bucket_name="personal-finance-dashboard"
-        )
+        processor = get_data_processor(project_id)
         
         # Process the data
         result = processor.process_files(
             institution=data["institution"],
             file_paths=data["file_paths"],
-            force_reprocess=data.get("force_reprocess", False)
+            force_reprocess=data.get("force_reprocess", False),
+            max_workers=min(MAX_FILE_WORKERS, len(data["file_paths"]))
         )
         
         return jsonify({
@@ -97,81 +213,16 @@ def get_status(job_id):
 def init_categories():
     """Initialize the categories dimension table with predefined taxonomy"""
     try:
-        # Load categories from the taxonomy
-        categories_data = [
-            {"general_category": "Groceries", "detailed_category": "Supermarkets"},
-            {"general_category": "Groceries", "detailed_category": "Convenience Stores"},
-            {"general_category": "Groceries", "detailed_category": "Specialty Food Stores"},
-            {"general_category": "Dining & Restaurants", "detailed_category": "Coffee Shops"},
-            {"general_category": "Dining & Restaurants", "detailed_category": "Fast Food"},
-            {"general_category": "Dining & Restaurants", "detailed_category": "Takeout & Delivery"},
-            {"general_category": "Dining & Restaurants", "detailed_category": "Sit-down Restaurants"},
-            {"general_category": "Shopping", "detailed_category": "Clothing"},
-            {"general_category": "Shopping", "detailed_category": "Electronics"},
-            {"general_category": "Shopping", "detailed_category": "Online Retail"},
-            {"general_category": "Shopping", "detailed_category": "Department Stores"},
-            {"general_category": "Shopping", "detailed_category": "Gifts"},
-            {"general_category": "Shopping", "detailed_category": "Beauty & Cosmetics"},
-            {"general_category": "Personal Care", "detailed_category": "Salons & Spas"},
-            {"general_category": "Personal Care", "detailed_category": "Barbershops"},
-            {"general_category": "Personal Care", "detailed_category": "Skincare & Grooming"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Rent / Mortgage"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Electricity"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Water"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Gas"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Internet"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Phone"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Trash & Recycling"},
-            {"general_category": "Housing & Utilities", "detailed_category": "Home Supplies & Repairs"},
-            {"general_category": "Transportation", "detailed_category": "Gas & Fuel"},
-            {"general_category": "Transportation", "detailed_category": "Rideshare"},
-            {"general_category": "Transportation", "detailed_category": "Public Transit"},
-            {"general_category": "Transportation", "detailed_category": "Parking"},
-            {"general_category": "Transportation", "detailed_category": "Tolls"},
-            {"general_category": "Transportation", "detailed_category": "Vehicle Maintenance"},
-            {"general_category": "Transportation", "detailed_category": "Car Insurance"},
-            {"general_category": "Financial", "detailed_category": "Credit Card Payments"},
-            {"general_category": "Financial", "detailed_category": "Bank Fees"},
-            {"general_category": "Financial", "detailed_category": "Investments"},
-            {"general_category": "Financial", "detailed_category": "Interest / Dividends"},
-            {"general_category": "Financial", "detailed_category": "Loan Payments"},
-            {"general_category": "Financial", "detailed_category": "RRSP/TFSA Contributions"},
-            {"general_category": "Health & Wellness", "detailed_category": "Pharmacy"},
-            {"general_category": "Health & Wellness", "detailed_category": "Medical & Dental"},
-            {"general_category": "Health & Wellness", "detailed_category": "Health Insurance"},
-            {"general_category": "Health & Wellness", "detailed_category": "Gym / Fitness"},
-            {"general_category": "Health & Wellness", "detailed_category": "Sports"},
-            {"general_category": "Lifestyle & Entertainment", "detailed_category": "Streaming Services"},
-            {"general_category": "Lifestyle & Entertainment", "detailed_category": "Movies & Events"},
-            {"general_category": "Lifestyle & Entertainment", "detailed_category": "Travel"},
-            {"general_category": "Lifestyle & Entertainment", "detailed_category": "Airbnb"},
-            {"general_category": "Lifestyle & Entertainment", "detailed_category": "Subscriptions & Hobbies"},
-            {"general_category": "Lifestyle & Entertainment", "detailed_category": "Vacation Spending"},
-            {"general_category": "Education", "detailed_category": "Tuition"},
-            {"general_category": "Education", "detailed_category": "Online Courses"},
-            {"general_category": "Education", "detailed_category": "Books & Materials"},
-            {"general_category": "Income & Transfers", "detailed_category": "Salary / Paycheck"},
-            {"general_category": "Income & Transfers", "detailed_category": "Cash Back / Rewards"},
-            {"general_category": "Income & Transfers", "detailed_category": "Internal Transfers"},
-            {"general_category": "Income & Transfers", "detailed_category": "Refunds & Reimbursements"},
-            {"general_category": "Work & Business", "detailed_category": "Business Travel"},
-            {"general_category": "Work & Business", "detailed_category": "Meals"},
-            {"general_category": "Work & Business", "detailed_category": "Contractor Income"},
-            {"general_category": "Work & Business", "detailed_category": "Software / Tools"},
-            {"general_category": "Uncategorized", "detailed_category": "Uncategorized"}
-        ]
-        
         project_id = os.environ.get('GCP_PROJECT_ID')
         if not project_id:
             return jsonify({"error": "GCP_PROJECT_ID environment variable not set"}), 500
         
-        from src.bigquery_manager import BigQueryManager
-        bq_manager = BigQueryManager(project_id, "personal_finance")
-        bq_manager.initialize_categories(categories_data)
+        bq_manager = get_bq_manager(project_id)
+        bq_manager.initialize_categories(_CATEGORIES_TAXONOMY)
         
         return jsonify({
             "status": "success",
-            "message": f"Initialized categories table with {len(categories_data)} categories"
+            "message": f"Initialized categories table with {len(_CATEGORIES_TAXONOMY)} categories"
         }), 200
         
     except Exception as e:
@@ -1,23 +1,86 @@
+import functools
+import io
 import logging
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Iterable, Optional, Sequence, Tuple
+import orjson
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from cachetools import TTLCache
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
-from datetime import datetime
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
+# (project_id, dataset_id) pairs whose dataset and tables were verified recently
+_VERIFIED: TTLCache = TTLCache(maxsize=32, ttl=3600)
+_VERIFIED_LOCK = threading.Lock()
+
+# One BigQuery client per project, shared by every manager in the process
+_BQ_CLIENTS: Dict[str, bigquery.Client] = {}
+_BQ_CLIENTS_LOCK = threading.Lock()
+
+# Arrow types used when staging raw rows as Parquet for each BigQuery column type
+_ARROW_TYPES = {
+    "STRING": pa.string(),
+    "NUMERIC": pa.decimal128(38, 9),
+    "DATE": pa.date32(),
+    "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+    "BOOLEAN": pa.bool_()
+}
+
+# Writes smaller than this use streaming inserts instead of a load job
+_STREAMING_INSERT_THRESHOLD = 500
+
+# SQL expressions that fill columns added to existing tables, by column name
+_FIELD_BACKFILLS = {
+    "description_key": "NULLIF(UPPER(TRIM(description)), '')"
+}
+
+def _get_client(project_id: str) -> bigquery.Client:
+    """Return the shared BigQuery client for a project, creating it on first use"""
+    client = _BQ_CLIENTS.get(project_id)
+    if client is None:
+        with _BQ_CLIENTS_LOCK:
+            client = _BQ_CLIENTS.get(project_id)
+            if client is None:
+                client = bigquery.Client(project=project_id)
+                _BQ_CLIENTS[project_id] = client
+    return client
+
+@functools.lru_cache(maxsize=None)
+def _category_ids(count: int) -> Tuple[str, ...]:
+    """Zero-padded category ids for a taxonomy of the given size"""
+    return tuple(f"cat_{i:03d}" for i in range(1, count + 1))
+
 class BigQueryManager:
     """Handle all BigQuery operations"""
     
     def __init__(self, project_id: str, dataset_id: str):
         self.project_id = project_id
         self.dataset_id = dataset_id
-        self.client = bigquery.Client(project=project_id)
+        self.client = _get_client(project_id)
         self.dataset_ref = self.client.dataset(dataset_id)
+        self._raw_schemas = {
+            'raw_amex_transactions': self._get_raw_amex_schema(),
+            'raw_wealthsimple_transactions': self._get_raw_wealthsimple_schema()
+        }
         
-        # Ensure dataset and tables exist
-        self._ensure_dataset_exists()
-        self._ensure_tables_exist()
+        # Cache file hash lookups so repeated checks in a batch skip BigQuery
+        self._file_hash_cache = TTLCache(maxsize=1024, ttl=300)
+        self._file_hash_lock = threading.Lock()
+        
+        # Ensure dataset and tables exist (skipped if verified recently)
+        verified_key = (project_id, dataset_id)
+        with _VERIFIED_LOCK:
+            already_verified = verified_key in _VERIFIED
+        if not already_verified:
+            self._ensure_dataset_exists()
+            self._ensure_tables_exist()
+            with _VERIFIED_LOCK:
+                _VERIFIED[verified_key] = True
     
     def _ensure_dataset_exists(self):
         """Create dataset if it doesn't exist"""
@@ -33,27 +96,78 @@ class BigQueryManager:
     def _ensure_tables_exist(self):
         """Create all required tables if they don't exist"""
         tables_to_create = {
-            'raw_amex_transactions': self._get_raw_amex_schema(),
-            'raw_wealthsimple_transactions': self._get_raw_wealthsimple_schema(),
+            **self._raw_schemas,
             'dim_categories': self._get_dim_categories_schema(),
-            'dim_description_categories': self._get_dim_description_categories_schema()
+            'dim_description_categories': self._get_dim_description_categories_schema(),
+            'processed_files_meta': self._get_processed_files_meta_schema()
+        }
+        
+        # Cluster raw tables by file hash and normalized description so per-file
+        # lookups, deletes and the description anti-join read clustered ranges
+        clustering = {
+            'raw_amex_transactions': ["file_hash", "description_key"],
+            'raw_wealthsimple_transactions': ["file_hash", "description_key"],
+            'dim_description_categories': ["description_key"],
+            'processed_files_meta': ["file_name"]
+        }
+        
+        # Partition raw tables by upload day. Per-file lookups and deletes filter on
+        # file_hash, so they rely on clustering rather than partition pruning;
+        # only queries filtered on upload_timestamp prune partitions
+        partitioning = {
+            'raw_amex_transactions': "upload_timestamp",
+            'raw_wealthsimple_transactions': "upload_timestamp"
         }
         
         for table_name, schema in tables_to_create.items():
-            self._create_table_if_not_exists(table_name, schema)
+            self._create_table_if_not_exists(
+                table_name, schema, clustering.get(table_name), partitioning.get(table_name)
+            )
     
-    def _create_table_if_not_exists(self, table_name: str, schema: List[bigquery.SchemaField]):
-        """Create table if it doesn't exist"""
+    def _create_table_if_not_exists(self, table_name: str, schema: List[bigquery.SchemaField],
+                                    clustering_fields: Optional[List[str]] = None,
+                                    partition_field: Optional[str] = None):
+        """Create table if it doesn't exist, or add fields missing from an existing table"""
         table_ref = self.dataset_ref.table(table_name)
         
         try:
-            self.client.get_table(table_ref)
+            table = self.client.get_table(table_ref)
             logger.info(f"Table {table_name} already exists")
+            self._add_missing_fields(table, schema)
         except NotFound:
             table = bigquery.Table(table_ref, schema=schema)
+            if partition_field:
+                table.time_partitioning = bigquery.TimePartitioning(
+                    type_=bigquery.TimePartitioningType.DAY, field=partition_field
+                )
+            if clustering_fields:
+                table.clustering_fields = clustering_fields
             table = self.client.create_table(table)
             logger.info(f"Created table {table_name}")
     
+    def _add_missing_fields(self, table: bigquery.Table, schema: List[bigquery.SchemaField]):
+        """Add schema fields missing from an existing table and backfill them where possible"""
+        existing = {field.name for field in table.schema}
+        missing = [field for field in schema if field.name not in existing]
+        if not missing:
+            return
+        
+        table.schema = list(table.schema) + missing
+        self.client.update_table(table, ["schema"])
+        logger.info(f"Added fields {[field.name for field in missing]} to {table.table_id}")
+        
+        for field in missing:
+            expression = _FIELD_BACKFILLS.get(field.name)
+            if expression is None:
+                continue
+            query = f"""
+            UPDATE `{self.project_id}.{self.dataset_id}.{table.table_id}`
+            SET {field.name} = {expression}
+            WHERE {field.name} IS NULL
+            """
+            self.client.query(query).result()
+            logger.info(f"Backfilled {field.name} in {table.table_id}")
+    
     def _get_raw_amex_schema(self) -> List[bigquery.SchemaField]:
         """Schema for raw_amex_transactions table"""
         return [
@@ -64,6 +178,7 @@ class BigQueryManager:
             bigquery.SchemaField("date", "DATE", mode="NULLABLE"),
             bigquery.SchemaField("date_processed", "DATE", mode="NULLABLE"),
             bigquery.SchemaField("description", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("description_key", "STRING", mode="NULLABLE"),
             bigquery.SchemaField("cardmember", "STRING", mode="NULLABLE"),
             bigquery.SchemaField("amount", "NUMERIC", mode="NULLABLE"),
             bigquery.SchemaField("foreign_spend_amount", "NUMERIC", mode="NULLABLE"),
@@ -87,6 +202,7 @@ class BigQueryManager:
             bigquery.SchemaField("date", "DATE", mode="NULLABLE"),
             bigquery.SchemaField("transaction", "STRING", mode="NULLABLE"),
             bigquery.SchemaField("description", "STRING", mode="NULLABLE"),
+            bigquery.SchemaField("description_key", "STRING", mode="NULLABLE"),
             bigquery.SchemaField("amount", "NUMERIC", mode="NULLABLE"),
             bigquery.SchemaField("balance", "NUMERIC", mode="NULLABLE"),
             bigquery.SchemaField("row_hash", "STRING", mode="REQUIRED"),
@@ -117,17 +233,82 @@ class BigQueryManager:
             bigquery.SchemaField("updated_at", "TIMESTAMP", mode="REQUIRED")
         ]
     
+    def _get_processed_files_meta_schema(self) -> List[bigquery.SchemaField]:
+        """Schema for processed_files_meta table (file identity -> content hash)"""
+        return [
+            bigquery.SchemaField("file_name", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("file_size", "INTEGER", mode="REQUIRED"),
+            bigquery.SchemaField("file_updated", "TIMESTAMP", mode="REQUIRED"),
+            bigquery.SchemaField("file_hash", "STRING", mode="REQUIRED"),
+            bigquery.SchemaField("created_at", "TIMESTAMP", mode="REQUIRED")
+        ]
+    
+    def file_seen_with_identity(self, file_name: str, file_size: int, file_updated: datetime) -> bool:
+        """Check if a file with the same path, size and update time was already processed"""
+        query = f"""
+        SELECT 1
+        FROM `{self.project_id}.{self.dataset_id}.processed_files_meta`
+        WHERE file_name = @file_name
+            AND file_size = @file_size
+            AND file_updated = @file_updated
+        LIMIT 1
+        """
+        
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("file_name", "STRING", file_name),
+                bigquery.ScalarQueryParameter("file_size", "INT64", file_size),
+                bigquery.ScalarQueryParameter("file_updated", "TIMESTAMP", file_updated)
+            ]
+        )
+        
+        result = self.client.query(query, job_config=job_config).result()
+        return next(iter(result), None) is not None
+    
+    def record_file_identities(self, identities: List[Dict[str, Any]]) -> int:
+        """Record (file_name, file_size, file_updated, file_hash) entries for processed files"""
+        if not identities:
+            return 0
+        
+        now = datetime.now(timezone.utc).isoformat()
+        rows = [{
+            'file_name': identity['file_name'],
+            'file_size': identity['file_size'],
+            'file_updated': identity['file_updated'].isoformat(),
+            'file_hash': identity['file_hash'],
+            'created_at': now
+        } for identity in identities]
+        
+        # Load job rather than streaming insert, so delete_file_data can DELETE these rows
+        # without hitting the streaming buffer
+        rows_recorded = self._load_json_rows(self.dataset_ref.table('processed_files_meta'), rows)
+        logger.info(f"Recorded {rows_recorded} processed file identities")
+        return rows_recorded
+    
     def file_already_processed(self, file_hash: str) -> bool:
-        """Check if file has already been processed"""
+        """Check if file has already been processed (cached per file hash)"""
+        with self._file_hash_lock:
+            cached = self._file_hash_cache.get(file_hash)
+        if cached is not None:
+            return cached
+        
+        processed = self._file_already_processed_uncached(file_hash)
+        with self._file_hash_lock:
+            self._file_hash_cache[file_hash] = processed
+        return processed
+    
+    def _file_already_processed_uncached(self, file_hash: str) -> bool:
+        """Query BigQuery for any raw rows loaded from the given file hash"""
         query = f"""
-        SELECT COUNT(*) as count
+        SELECT file_hash
         FROM (
-            SELECT file_hash FROM `{self.project_id}.{self.dataset_id}.raw_amex_transactions`
-            WHERE file_hash = @file_hash
+            (SELECT file_hash FROM `{self.project_id}.{self.dataset_id}.raw_amex_transactions`
+            WHERE file_hash = @file_hash LIMIT 1)
             UNION ALL
-            SELECT file_hash FROM `{self.project_id}.{self.dataset_id}.raw_wealthsimple_transactions`
-            WHERE file_hash = @file_hash
+            (SELECT file_hash FROM `{self.project_id}.{self.dataset_id}.raw_wealthsimple_transactions`
+            WHERE file_hash = @file_hash LIMIT 1)
         )
+        LIMIT 1
         """
         
         job_config = bigquery.QueryJobConfig(
@@ -137,61 +318,104 @@ class BigQueryManager:
         )
         
         result = self.client.query(query, job_config=job_config).result()
-        count = next(result).count
-        return count > 0
+        return next(iter(result), None) is not None
     
-    def load_raw_data(self, institution: str, rows: List[Dict[str, Any]], metadata: Dict[str, Any]) -> int:
-        """Load raw data into appropriate BigQuery table"""
+    def load_raw_data(self, institution: str, frame: pd.DataFrame, metadata: Dict[str, Any]) -> int:
+        """Load raw data into appropriate BigQuery table via a Parquet load job"""
         table_name = f"raw_{institution}_transactions"
         table_ref = self.dataset_ref.table(table_name)
+        schema = self._raw_schemas[table_name]
+        
+        frame = frame.assign(
+            # Persist the normalized description used to join against the category cache
+            description_key=frame['description'].fillna('').str.strip().str.upper().replace('', None),
+            created_at=pd.Timestamp.now(tz=timezone.utc)
+        )
+        
+        buffer = io.BytesIO()
+        pq.write_table(self._to_arrow(frame, schema), buffer)
+        
+        job_config = bigquery.LoadJobConfig(
+            source_format=bigquery.SourceFormat.PARQUET,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+            schema=schema,
+            # Add columns missing from tables created before the schema grew
+            schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
+        )
+        
+        job = self.client.load_table_from_file(
+            buffer, table_ref, job_config=job_config, rewind=True
+        )
+        job.result()  # Wait for job to complete
         
-        # Convert datetime objects to strings for BigQuery
-        processed_rows = []
+        # Files just loaded count as processed for subsequent lookups
+        with self._file_hash_lock:
+            for file_hash in frame['file_hash'].unique():
+                self._file_hash_cache[file_hash] = True
+        
+        logger.info(f"Loaded {len(frame)} rows into {table_name}")
+        return len(frame)
+    
+    def _to_arrow(self, frame: pd.DataFrame, schema: List[bigquery.SchemaField]) -> pa.Table:
+        """Convert a DataFrame to an Arrow table typed and ordered by a BigQuery schema"""
+        fields = []
+        arrays = []
+        for field in schema:
+            arrow_type = _ARROW_TYPES[field.field_type]
+            if field.name in frame.columns:
+                array = pa.array(frame[field.name], from_pandas=True).cast(arrow_type)
+            else:
+                array = pa.nulls(len(frame), type=arrow_type)
+            fields.append(pa.field(field.name, arrow_type, nullable=field.mode != "REQUIRED"))
+            arrays.append(array)
+        return pa.Table.from_arrays(arrays, schema=pa.schema(fields))
+    
+    def _load_json_rows(self, table_ref: bigquery.TableReference, rows: Iterable[Dict[str, Any]]) -> int:
+        """Serialize rows to newline-delimited JSON and append them with a single load job"""
+        buffer = io.BytesIO()
+        row_count = 0
         for row in rows:
-            processed_row = row.copy()
-            for key, value in processed_row.items():
-                if isinstance(value, datetime):
-                    processed_row[key] = value.isoformat()
-                elif hasattr(value, 'isoformat'):  # date objects
-                    processed_row[key] = value.isoformat()
-            
-            # Add created_at timestamp
-            processed_row['created_at'] = datetime.utcnow().isoformat()
-            processed_rows.append(processed_row)
-        
-        # Load data
+            buffer.write(orjson.dumps(row, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+            row_count += 1
+        
         job_config = bigquery.LoadJobConfig(
             source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
             write_disposition=bigquery.WriteDisposition.WRITE_APPEND
         )
         
-        job = self.client.load_table_from_json(
-            processed_rows, table_ref, job_config=job_config
+        job = self.client.load_table_from_file(
+            buffer, table_ref, job_config=job_config, rewind=True
         )
         job.result()  # Wait for job to complete
+        return row_count
+    
+    def _insert_rows(self, table_ref: bigquery.TableReference, rows: List[Dict[str, Any]],
+                     row_ids: Optional[List[str]] = None) -> int:
+        """Append rows via streaming insert for small batches, falling back to a load job"""
+        if len(rows) >= _STREAMING_INSERT_THRESHOLD:
+            return self._load_json_rows(table_ref, rows)
         
-        logger.info(f"Loaded {len(processed_rows)} rows into {table_name}")
-        return len(processed_rows)
+        errors = self.client.insert_rows_json(table_ref, rows, row_ids=row_ids)
+        if errors:
+            raise Exception(f"Streaming insert into {table_ref.table_id} failed: {errors}")
+        return len(rows)
     
     def get_uncategorized_descriptions(self) -> List[str]:
         """Get unique descriptions that haven't been categorized by Gemini"""
         query = f"""
-        WITH all_descriptions AS (
-            SELECT DISTINCT UPPER(TRIM(description)) as description_key
-            FROM (
-                SELECT description FROM `{self.project_id}.{self.dataset_id}.raw_amex_transactions`
-                WHERE description IS NOT NULL AND description != ''
-                UNION ALL
-                SELECT description FROM `{self.project_id}.{self.dataset_id}.raw_wealthsimple_transactions`
-                WHERE description IS NOT NULL AND description != ''
+        SELECT DISTINCT r.description_key
+        FROM (
+            SELECT description_key FROM `{self.project_id}.{self.dataset_id}.raw_amex_transactions`
+            UNION ALL
+            SELECT description_key FROM `{self.project_id}.{self.dataset_id}.raw_wealthsimple_transactions`
+        ) r
+        WHERE r.description_key IS NOT NULL
+            AND NOT EXISTS (
+                SELECT 1
+                FROM `{self.project_id}.{self.dataset_id}.dim_description_categories` dc
+                WHERE dc.description_key = r.description_key
             )
-        )
-        SELECT ad.description_key
-        FROM all_descriptions ad
-        LEFT JOIN `{self.project_id}.{self.dataset_id}.dim_description_categories` dc
-            ON ad.description_key = UPPER(TRIM(dc.description_key))
-        WHERE dc.description_key IS NULL
-        ORDER BY ad.description_key
+        ORDER BY r.description_key
         LIMIT 100  -- Process in batches to avoid Gemini API limits
         """
         
@@ -208,98 +432,81 @@ class BigQueryManager:
         
         table_ref = self.dataset_ref.table('dim_description_categories')
         
-        # Prepare data for insertion
-        rows_to_insert = []
-        for category in new_categories:
-            row = {
-                'description_key': category['description_key'],
-                'original_description': category['original_description'],
-                'general_category': category['general_category'],
-                'detailed_category': category['detailed_category'],
-                'confidence_score': category.get('confidence_score'),
-                'gemini_model_version': category.get('gemini_model_version', 'gemini-1.5-flash'),
-                'created_at': datetime.utcnow().isoformat(),
-                'updated_at': datetime.utcnow().isoformat()
-            }
-            rows_to_insert.append(row)
-        
-        # Insert data
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-            write_disposition=bigquery.WriteDisposition.WRITE_APPEND
-        )
+        now = datetime.now(timezone.utc).isoformat()
+        rows_to_insert = [{
+            'description_key': category['description_key'],
+            'original_description': category['original_description'],
+            'general_category': category['general_category'],
+            'detailed_category': category['detailed_category'],
+            'confidence_score': category.get('confidence_score'),
+            'gemini_model_version': category.get('gemini_model_version', 'gemini-1.5-flash'),
+            'created_at': now,
+            'updated_at': now
+        } for category in new_categories]
         
-        job = self.client.load_table_from_json(
-            rows_to_insert, table_ref, job_config=job_config
+        # Key streaming inserts by description so retried batches are deduplicated
+        rows_inserted = self._insert_rows(
+            table_ref, rows_to_insert, row_ids=[row['description_key'] for row in rows_to_insert]
         )
-        job.result()  # Wait for job to complete
         
-        logger.info(f"Updated category cache with {len(rows_to_insert)} new entries")
-        return len(rows_to_insert)
+        logger.info(f"Updated category cache with {rows_inserted} new entries")
+        return rows_inserted
     
     def delete_file_data(self, file_hash: str) -> int:
-        """Delete all data associated with a file hash"""
-        total_deleted = 0
+        """Delete all data associated with a file hash from the raw tables and file metadata in one script job"""
+        query = f"""
+        DECLARE amex_deleted INT64 DEFAULT 0;
+        DECLARE wealthsimple_deleted INT64 DEFAULT 0;
+        DELETE FROM `{self.project_id}.{self.dataset_id}.raw_amex_transactions`
+        WHERE file_hash = @file_hash;
+        SET amex_deleted = @@row_count;
+        DELETE FROM `{self.project_id}.{self.dataset_id}.raw_wealthsimple_transactions`
+        WHERE file_hash = @file_hash;
+        SET wealthsimple_deleted = @@row_count;
+        DELETE FROM `{self.project_id}.{self.dataset_id}.processed_files_meta`
+        WHERE file_hash = @file_hash;
+        SELECT amex_deleted, wealthsimple_deleted;
+        """
         
-        # Delete from both raw tables
-        tables = ['raw_amex_transactions', 'raw_wealthsimple_transactions']
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("file_hash", "STRING", file_hash)
+            ]
+        )
         
-        for table_name in tables:
-            query = f"""
-            DELETE FROM `{self.project_id}.{self.dataset_id}.{table_name}`
-            WHERE file_hash = @file_hash
-            """
-            
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("file_hash", "STRING", file_hash)
-                ]
-            )
-            
-            job = self.client.query(query, job_config=job_config)
-            result = job.result()
-            
-            if hasattr(job, 'num_dml_affected_rows'):
-                rows_deleted = job.num_dml_affected_rows or 0
-                total_deleted += rows_deleted
-                logger.info(f"Deleted {rows_deleted} rows from {table_name}")
+        result = self.client.query(query, job_config=job_config).result()
+        row = next(iter(result))
+        logger.info(f"Deleted {row.amex_deleted} rows from raw_amex_transactions")
+        logger.info(f"Deleted {row.wealthsimple_deleted} rows from raw_wealthsimple_transactions")
+        total_deleted = row.amex_deleted + row.wealthsimple_deleted
+        
+        with self._file_hash_lock:
+            self._file_hash_cache.pop(file_hash, None)
         
         return total_deleted
     
-    def initialize_categories(self, categories_data: List[Dict[str, str]]):
-        """Initialize the categories dimension table with predefined data"""
+    def initialize_categories(self, taxonomy: Sequence[Tuple[str, str]]):
+        """Initialize the categories dimension table from (general, detailed) category pairs"""
         table_ref = self.dataset_ref.table('dim_categories')
         
         # Check if data already exists
-        query = f"SELECT COUNT(*) as count FROM `{self.project_id}.{self.dataset_id}.dim_categories`"
+        query = f"SELECT 1 FROM `{self.project_id}.{self.dataset_id}.dim_categories` LIMIT 1"
         result = self.client.query(query).result()
-        count = next(result).count
         
-        if count > 0:
+        if result.total_rows > 0:
             logger.info("Categories table already populated")
             return
         
-        # Prepare data for insertion
-        rows_to_insert = []
-        for i, category in enumerate(categories_data):
-            row = {
-                'category_id': f"cat_{i+1:03d}",
-                'general_category': category['general_category'],
-                'detailed_category': category['detailed_category'],
-                'is_active': True,
-                'created_at': datetime.utcnow().isoformat()
-            }
-            rows_to_insert.append(row)
-        
-        # Insert data
-        job_config = bigquery.LoadJobConfig(
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-            write_disposition=bigquery.WriteDisposition.WRITE_APPEND
-        )
+        now = datetime.now(timezone.utc).isoformat()
+        category_ids = _category_ids(len(taxonomy))
+        rows_to_insert = [{
+            'category_id': category_id,
+            'general_category': general_category,
+            'detailed_category': detailed_category,
+            'is_active': True,
+            'created_at': now
+        } for category_id, (general_category, detailed_category) in zip(category_ids, taxonomy)]
         
-        job = self.client.load_table_from_json(
-            rows_to_insert, table_ref, job_config=job_config
-        )
-        job.result()  # Wait for job to complete
+        rows_inserted = self._insert_rows(table_ref, rows_to_insert, row_ids=list(category_ids))
         
-        logger.info(f"Initialized categories table with {len(rows_to_insert)} categories") 
\ No newline at end of file
+        logger.info(f"Initialized categories table with {rows_inserted} categories")
@@ -1,9 +1,13 @@
 import logging
-import subprocess
 import os
 import hashlib
-from typing import List, Dict, Any
-from datetime import datetime
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Optional, Tuple
+import pandas as pd
+from dbt.cli.main import dbtRunner
+from dbt.contracts.results import RunStatus
 
 from .file_processor import FileProcessor
 from .bigquery_manager import BigQueryManager
@@ -11,6 +15,23 @@ from .gemini_enricher import GeminiEnricher
 
 logger = logging.getLogger(__name__)
 
+DBT_DIR = "/app/dbt_project"
+
+# dbt packages only need installing once per container
+_DBT_DEPS_INSTALLED = False
+# dbt keeps global state per process, so invocations must not overlap
+_DBT_LOCK = threading.Lock()
+
+def _invoke_dbt(runner: dbtRunner, args: List[str]):
+    """Invoke a dbt command in-process against the bundled project"""
+    res = runner.invoke([*args, "--project-dir", DBT_DIR])
+    if not res.success:
+        if res.exception is not None:
+            raise Exception(f"dbt transformation failed: {res.exception}")
+        failed = [r.node.unique_id for r in res.result if r.status != RunStatus.Success]
+        raise Exception(f"dbt transformation failed for: {failed}")
+    return res
+
 class DataProcessor:
     """Main data processing orchestrator"""
     
@@ -26,13 +47,17 @@ class DataProcessor:
         
         # Set dbt environment variables
         os.environ['DBT_GCP_PROJECT'] = project_id
+        
+        # In-process dbt, avoiding a subprocess and cold import per run
+        self._dbt = dbtRunner()
     
-    def process_files(self, institution: str, file_paths: List[str], force_reprocess: bool = False) -> Dict[str, Any]:
+    def process_files(self, institution: str, file_paths: List[str], force_reprocess: bool = False,
+                      max_workers: int = 1) -> Dict[str, Any]:
         """
         Main processing pipeline
         
         Steps:
-        1. Check which files need processing (file hash cache)
+        1. Check which files need processing (file identity and hash caches)
         2. Parse CSV/XLSX files and load raw data to BigQuery
         3. Run dbt transformations
         4. Identify uncategorized transactions for Gemini enrichment
@@ -49,11 +74,11 @@ class DataProcessor:
             "processing_time_seconds": 0
         }
         
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         
         try:
             # Step 1: Filter files that need processing
-            files_to_process = self._filter_files_for_processing(file_paths, force_reprocess)
+            files_to_process = self._filter_files_for_processing(file_paths, force_reprocess, max_workers)
             logger.info(f"Files to process: {len(files_to_process)} of {len(file_paths)}")
             
             if not files_to_process:
@@ -61,7 +86,7 @@ class DataProcessor:
                 return result
             
             # Step 2: Process files and load raw data
-            rows_inserted = self._process_and_load_files(institution, files_to_process)
+            rows_inserted = self._process_and_load_files(institution, files_to_process, max_workers)
             result["files_processed"] = len(files_to_process)
             result["rows_inserted"] = rows_inserted
             
@@ -74,17 +99,14 @@ class DataProcessor:
             
             # Step 5: Enrich with Gemini
             if uncategorized_descriptions:
-                new_categories = self.gemini_enricher.categorize_descriptions(uncategorized_descriptions)
-                self.bq_manager.update_category_cache(new_categories)
-                result["new_categories"] = len(new_categories)
+                result["new_categories"] = self._enrich_descriptions(uncategorized_descriptions)
             
             # Step 6: Run final dbt transformations (all models)
             dbt_result = self._run_dbt_models(["intermediate", "marts"])
             result["dbt_models_built"] = dbt_result.get("models_built", 0)
             
             # Calculate processing time
-            end_time = datetime.now()
-            result["processing_time_seconds"] = (end_time - start_time).total_seconds()
+            result["processing_time_seconds"] = time.perf_counter() - start_time
             
             logger.info(f"Processing completed successfully: {result}")
             return result
@@ -93,71 +115,124 @@ class DataProcessor:
             logger.error(f"Error in data processing pipeline: {str(e)}", exc_info=True)
             raise
     
-    def _filter_files_for_processing(self, file_paths: List[str], force_reprocess: bool) -> List[str]:
-        """Filter files based on file hash cache"""
+    def _filter_files_for_processing(self, file_paths: List[str], force_reprocess: bool,
+                                     max_workers: int = 1) -> Dict[str, Dict[str, Any]]:
+        """Filter files based on file identity and hash caches, checking files concurrently
+        
+        Returns the files to process mapped to their identity and content hash
+        (file_hash is None when the file was not hashed).
+        """
         if force_reprocess:
-            return file_paths
+            return {file_path: {"file_name": file_path, "file_hash": None} for file_path in file_paths}
         
-        files_to_process = []
-        for file_path in file_paths:
-            file_hash = self.file_processor.get_file_hash(file_path)
-            if not self.bq_manager.file_already_processed(file_hash):
-                files_to_process.append(file_path)
+        files_to_process = {}
+        new_identities = []
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            checks = executor.map(self._check_one, file_paths)
+            for file_path, (file_info, already_processed) in zip(file_paths, checks):
+                if not already_processed:
+                    files_to_process[file_path] = file_info
+                elif file_info["file_hash"] is not None:
+                    # Content was loaded before under another path or mtime; remember this
+                    # identity so the next run skips the download
+                    new_identities.append(file_info)
         
+        self.bq_manager.record_file_identities(new_identities)
         return files_to_process
     
-    def _process_and_load_files(self, institution: str, file_paths: List[str]) -> int:
-        """Process files and load data into BigQuery"""
-        total_rows = 0
+    def _check_one(self, file_path: str) -> Tuple[Dict[str, Any], bool]:
+        """Check a single file by (path, size, updated), hashing it only on a miss"""
+        file_size, file_updated = self.file_processor.get_file_identity(file_path)
+        file_info = {
+            "file_name": file_path,
+            "file_size": file_size,
+            "file_updated": file_updated,
+            "file_hash": None
+        }
+        if self.bq_manager.file_seen_with_identity(file_path, file_size, file_updated):
+            return file_info, True
         
-        for file_path in file_paths:
-            logger.info(f"Processing file: {file_path}")
-            
-            # Parse file
-            file_data = self.file_processor.parse_file(file_path, institution)
-            
-            # Load to BigQuery raw table
-            rows_inserted = self.bq_manager.load_raw_data(
-                institution, 
-                file_data["rows"], 
-                file_data["metadata"]
-            )
-            
-            total_rows += rows_inserted
-            logger.info(f"Loaded {rows_inserted} rows from {file_path}")
+        file_info["file_hash"] = self.file_processor.get_file_hash(file_path)
+        already_processed = self.bq_manager.file_already_processed(file_info["file_hash"])
+        if already_processed:
+            # The file will not be parsed, so release the content kept while hashing
+            self.file_processor.discard_content(file_info["file_hash"])
+        return file_info, already_processed
+    
+    def _process_and_load_files(self, institution: str, files: Dict[str, Dict[str, Any]], max_workers: int = 1) -> int:
+        """Parse files concurrently and load all their rows into BigQuery with one job"""
+        frames = []
+        all_metadata = []
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [
+                executor.submit(self._parse_one, institution, file_path, file_info["file_hash"])
+                for file_path, file_info in files.items()
+            ]
+            for future in as_completed(futures):
+                file_data = future.result()
+                frames.append(file_data["frame"])
+                all_metadata.append(file_data["metadata"])
         
-        return total_rows
+        # Load to BigQuery raw table
+        rows_inserted = self.bq_manager.load_raw_data(
+            institution,
+            pd.concat(frames, ignore_index=True),
+            {"files": all_metadata}
+        )
+        
+        # Record file identities only after their rows are loaded
+        self.bq_manager.record_file_identities([
+            {**files[metadata["file_name"]], "file_hash": metadata["file_hash"]}
+            for metadata in all_metadata
+            if "file_size" in files[metadata["file_name"]]
+        ])
+        
+        logger.info(f"Loaded {rows_inserted} rows from {len(all_metadata)} files")
+        return rows_inserted
+    
+    def _parse_one(self, institution: str, file_path: str, file_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Parse a single file, reusing the content fetched while hashing when available"""
+        logger.info(f"Processing file: {file_path}")
+        file_data = self.file_processor.parse_file(file_path, institution, file_hash=file_hash)
+        logger.info(f"Parsed {file_data['metadata']['row_count']} rows from {file_path}")
+        return file_data
+    
+    def _enrich_descriptions(self, descriptions: List[str]) -> int:
+        """Categorize descriptions, writing each batch of results while later Gemini batches are still running"""
+        rows_written = 0
+        
+        def write_batch(batch: List[Dict[str, Any]]):
+            nonlocal rows_written
+            rows_written += self.bq_manager.update_category_cache(batch)
+        
+        self.gemini_enricher.categorize_descriptions(descriptions, on_batch=write_batch)
+        return rows_written
     
     def _run_dbt_models(self, model_selections: List[str]) -> Dict[str, Any]:
         """Run dbt transformations"""
         logger.info(f"Running dbt models: {model_selections}")
         
-        try:
-            # Change to dbt project directory
-            dbt_dir = "/app/dbt_project"
-            
+        global _DBT_DEPS_INSTALLED
+        with _DBT_LOCK:
             # Install dbt packages if not already done
-            subprocess.run(["dbt", "deps"], cwd=dbt_dir, check=True, capture_output=True)
-            
-            models_built = 0
-            for selection in model_selections:
-                # Run specific model selection
-                cmd = ["dbt", "run", "--select", f"tag:{selection}"]
-                result = subprocess.run(cmd, cwd=dbt_dir, check=True, capture_output=True, text=True)
-                
-                # Parse dbt output to count models built
-                output_lines = result.stdout.split('\n')
-                for line in output_lines:
-                    if "Completed successfully" in line and "model" in line:
-                        models_built += 1
-                
-                logger.info(f"dbt run completed for {selection}: {result.stdout}")
-            
-            return {"models_built": models_built}
+            if not _DBT_DEPS_INSTALLED:
+                _invoke_dbt(self._dbt, ["deps"])
+                _DBT_DEPS_INSTALLED = True
             
-        except subprocess.CalledProcessError as e:
-            logger.error(f"dbt run failed: {e.stderr}")
-            raise Exception(f"dbt transformation failed: {e.stderr}")
+            # Run all selections in one invocation; dbt orders them by the DAG
+            res = _invoke_dbt(
+                self._dbt, ["run", "--select", *[f"tag:{selection}" for selection in model_selections]]
+            )
+        
+        # Count built models only, not seeds, snapshots or tests in the selection
+        models_built = sum(
+            1 for r in res.result
+            if r.status == RunStatus.Success and r.node.unique_id.startswith("model.")
+        )
+        logger.info(f"dbt run completed for {model_selections}: {models_built} models built")
+        
+        return {"models_built": models_built}
     
     def delete_file_data(self, file_path: str) -> Dict[str, Any]:
         """Delete all data associated with a file"""
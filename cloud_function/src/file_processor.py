@@ -1,13 +1,65 @@
 import logging
 import hashlib
+import threading
 import pandas as pd
 import io
-from typing import Dict, List, Any
-from datetime import datetime
+from typing import BinaryIO, Dict, Any, Optional, Tuple
+from datetime import datetime, timezone
+from cachetools import TTLCache
 from google.cloud import storage
 
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Upper bound on downloaded bytes kept between hashing and parsing a file
+CONTENT_CACHE_BYTES = 256 * 1024 * 1024
+
+def _optional_column(df: pd.DataFrame, column: str, default: Any = None) -> pd.Series:
+    """Return a column, or a column filled with the default if the file omits it"""
+    if column in df.columns:
+        return df[column]
+    return pd.Series([default] * len(df), index=df.index, dtype=object)
+
+def _date_column(series: pd.Series) -> pd.Series:
+    """Parse a column to datetime.date values, with None for missing dates
+
+    Each value is parsed on its own, as mixed formats can appear in one file,
+    and an unparseable date raises instead of loading as NULL.
+    """
+    parsed = pd.to_datetime(series, format='mixed')
+    return parsed.dt.date.astype(object).where(parsed.notna(), None)
+
+def _float_column(series: pd.Series) -> pd.Series:
+    """Convert a column to floats, with None for missing values"""
+    return pd.to_numeric(series).astype('float64').astype(object).where(series.notna(), None)
+
+def _text_column(series: pd.Series) -> pd.Series:
+    """Strip a required text column, storing missing cells as 'nan' like the original str() parse"""
+    return series.where(series.notna(), 'nan').astype(str).str.strip()
+
+def _string_column(series: pd.Series) -> pd.Series:
+    """Strip a text column, with None for missing values"""
+    return series.astype(str).str.strip().where(series.notna(), None)
+
+class _HashingReader(io.RawIOBase):
+    """Read-only stream that hashes bytes as they are read from the wrapped file"""
+    
+    def __init__(self, fh):
+        self._fh = fh
+        self._digest = hashlib.md5()
+    
+    def readable(self) -> bool:
+        return True
+    
+    def readinto(self, buffer) -> int:
+        data = self._fh.read(len(buffer))
+        buffer[:len(data)] = data
+        self._digest.update(data)
+        return len(data)
+    
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
 class FileProcessor:
     """Handle file processing from Google Cloud Storage"""
     
@@ -15,69 +67,103 @@ class FileProcessor:
         self.bucket_name = bucket_name
         self.client = storage.Client()
         self.bucket = self.client.bucket(bucket_name)
+        
+        # Downloaded file content keyed by content hash, so parse_file can reuse
+        # the bytes fetched by get_file_hash instead of downloading them again
+        self._content_cache = TTLCache(maxsize=CONTENT_CACHE_BYTES, ttl=300, getsizeof=len)
+        self._content_lock = threading.Lock()
+    
+    def get_file_identity(self, file_path: str) -> Tuple[int, datetime]:
+        """Get (size, updated) from blob metadata without downloading the file"""
+        blob = self.bucket.get_blob(file_path)
+        if blob is None:
+            raise ValueError(f"File not found: {file_path}")
+        return blob.size, blob.updated
     
     def get_file_hash(self, file_path: str) -> str:
         """Generate hash of file content for deduplication"""
         try:
             blob = self.bucket.blob(file_path)
-            file_content = blob.download_as_bytes()
-            return hashlib.md5(file_content).hexdigest()
+            md5 = hashlib.md5()
+            chunks = []
+            size = 0
+            # Hash while streaming and keep the content for a later parse_file call,
+            # unless the file is too large to cache
+            with blob.open("rb", chunk_size=DOWNLOAD_CHUNK_SIZE) as fh:
+                for chunk in iter(lambda: fh.read(DOWNLOAD_CHUNK_SIZE), b""):
+                    md5.update(chunk)
+                    size += len(chunk)
+                    if size <= CONTENT_CACHE_BYTES:
+                        chunks.append(chunk)
+                    else:
+                        chunks = None
+            file_hash = md5.hexdigest()
+            
+            if chunks is not None:
+                with self._content_lock:
+                    self._content_cache[file_hash] = b"".join(chunks)
+            return file_hash
         except Exception as e:
             logger.error(f"Error getting file hash for {file_path}: {str(e)}")
             raise
     
-    def parse_file(self, file_path: str, institution: str) -> Dict[str, Any]:
-        """Parse CSV/XLSX file and return structured data"""
+    def discard_content(self, file_hash: str):
+        """Drop content kept by get_file_hash for a file that will not be parsed"""
+        with self._content_lock:
+            self._content_cache.pop(file_hash, None)
+    
+    def parse_file(self, file_path: str, institution: str, file_hash: Optional[str] = None) -> Dict[str, Any]:
+        """Parse CSV/XLSX file and return structured data
+        
+        If file_hash comes from an earlier get_file_hash call, the content downloaded
+        then is reused and the file is neither downloaded nor hashed again.
+        """
         logger.info(f"Parsing file: {file_path} for institution: {institution}")
         
         try:
-            # Download file from GCS
-            blob = self.bucket.blob(file_path)
-            file_content = blob.download_as_bytes()
-            file_hash = hashlib.md5(file_content).hexdigest()
+            file_content = None
+            if file_hash is not None:
+                with self._content_lock:
+                    file_content = self._content_cache.pop(file_hash, None)
             
-            # Determine file type and parse
-            if file_path.lower().endswith('.csv'):
-                df = pd.read_csv(io.BytesIO(file_content))
-            elif file_path.lower().endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(io.BytesIO(file_content))
+            if file_content is not None:
+                df = self._read_frame(file_path, io.BytesIO(file_content))
             else:
-                raise ValueError(f"Unsupported file type: {file_path}")
+                # Stream from GCS straight into the reader, hashing on the way
+                blob = self.bucket.blob(file_path)
+                with blob.open("rb", chunk_size=DOWNLOAD_CHUNK_SIZE) as fh:
+                    reader = _HashingReader(fh)
+                    df = self._read_frame(file_path, reader)
+                file_hash = reader.hexdigest()
             
             # Parse based on institution
             if institution == 'amex':
-                parsed_data = self._parse_amex_data(df)
+                frame = self._parse_amex_data(df)
             elif institution == 'wealthsimple':
-                parsed_data = self._parse_wealthsimple_data(df)
+                frame = self._parse_wealthsimple_data(df)
             else:
                 raise ValueError(f"Unsupported institution: {institution}")
             
-            # Add metadata to each row
-            upload_timestamp = datetime.utcnow()
-            rows_with_metadata = []
+            # Generate row hash for deduplication
+            frame['row_hash'] = [
+                hashlib.md5(str(sorted(row.items())).encode()).hexdigest()
+                for row in frame.to_dict(orient='records')
+            ]
             
-            for row in parsed_data:
-                # Generate row hash for deduplication
-                row_content = str(sorted(row.items()))
-                row_hash = hashlib.md5(row_content.encode()).hexdigest()
-                
-                row_with_meta = {
-                    **row,
-                    'file_name': file_path,
-                    'file_hash': file_hash,
-                    'upload_timestamp': upload_timestamp,
-                    'processed_timestamp': None,
-                    'row_hash': row_hash,
-                    'is_processed': False
-                }
-                rows_with_metadata.append(row_with_meta)
+            # Add file metadata columns
+            upload_timestamp = datetime.now(timezone.utc)
+            frame['file_name'] = file_path
+            frame['file_hash'] = file_hash
+            frame['upload_timestamp'] = upload_timestamp
+            frame['processed_timestamp'] = None
+            frame['is_processed'] = False
             
             return {
-                "rows": rows_with_metadata,
+                "frame": frame,
                 "metadata": {
                     "file_name": file_path,
                     "file_hash": file_hash,
-                    "row_count": len(rows_with_metadata),
+                    "row_count": len(frame),
                     "upload_timestamp": upload_timestamp
                 }
             }
@@ -86,7 +172,17 @@ class FileProcessor:
             logger.error(f"Error parsing file {file_path}: {str(e)}", exc_info=True)
             raise
     
-    def _parse_amex_data(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _read_frame(self, file_path: str, source: BinaryIO) -> pd.DataFrame:
+        """Read a CSV/XLSX source into a DataFrame based on the file extension"""
+        if file_path.lower().endswith('.csv'):
+            # Arrow's multithreaded reader; column conversion stays in the institution parsers
+            return pd.read_csv(source, engine="pyarrow")
+        if file_path.lower().endswith(('.xlsx', '.xls', '.xlsb')):
+            # Excel readers need random access, so buffer the whole file
+            return pd.read_excel(io.BytesIO(source.read()), engine="calamine")
+        raise ValueError(f"Unsupported file type: {file_path}")
+    
+    def _parse_amex_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Parse AmEx CSV data"""
         logger.info("Parsing AmEx data")
         
@@ -109,27 +205,23 @@ class FileProcessor:
         if missing_columns:
             raise ValueError(f"Missing required AmEx columns: {missing_columns}")
         
-        rows = []
-        for _, row in df.iterrows():
-            parsed_row = {
-                'date': pd.to_datetime(row.get('Date')).date() if pd.notna(row.get('Date')) else None,
-                'date_processed': pd.to_datetime(row.get('Date Processed')).date() if pd.notna(row.get('Date Processed')) else None,
-                'description': str(row.get('Description', '')).strip(),
-                'cardmember': str(row.get('Cardmember', '')).strip(),
-                'amount': float(row.get('Amount', 0)) if pd.notna(row.get('Amount')) else 0.0,
-                'foreign_spend_amount': float(row.get('Foreign Spend Amount', 0)) if pd.notna(row.get('Foreign Spend Amount')) else None,
-                'commission': float(row.get('Commission', 0)) if pd.notna(row.get('Commission')) else None,
-                'exchange_rate': float(row.get('Exchange Rate', 0)) if pd.notna(row.get('Exchange Rate')) else None,
-                'merchant': str(row.get('Merchant', '')).strip() if pd.notna(row.get('Merchant')) else None,
-                'merchant_address': str(row.get('Merchant Address', '')).strip() if pd.notna(row.get('Merchant Address')) else None,
-                'additional_information': str(row.get('Additional Information', '')).strip() if pd.notna(row.get('Additional Information')) else None
-            }
-            rows.append(parsed_row)
+        out = pd.DataFrame(index=df.index)
+        out['date'] = _date_column(df['Date'])
+        out['date_processed'] = _date_column(_optional_column(df, 'Date Processed'))
+        out['description'] = _text_column(df['Description'])
+        out['cardmember'] = _text_column(_optional_column(df, 'Cardmember', ''))
+        out['amount'] = pd.to_numeric(df['Amount']).astype('float64').fillna(0.0)
+        out['foreign_spend_amount'] = _float_column(_optional_column(df, 'Foreign Spend Amount'))
+        out['commission'] = _float_column(_optional_column(df, 'Commission'))
+        out['exchange_rate'] = _float_column(_optional_column(df, 'Exchange Rate'))
+        out['merchant'] = _string_column(_optional_column(df, 'Merchant'))
+        out['merchant_address'] = _string_column(_optional_column(df, 'Merchant Address'))
+        out['additional_information'] = _string_column(_optional_column(df, 'Additional Information'))
         
-        logger.info(f"Parsed {len(rows)} AmEx transactions")
-        return rows
+        logger.info(f"Parsed {len(out)} AmEx transactions")
+        return out
     
-    def _parse_wealthsimple_data(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _parse_wealthsimple_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Parse Wealthsimple CSV data"""
         logger.info("Parsing Wealthsimple data")
         
@@ -148,16 +240,12 @@ class FileProcessor:
         if missing_columns:
             raise ValueError(f"Missing required Wealthsimple columns: {missing_columns}")
         
-        rows = []
-        for _, row in df.iterrows():
-            parsed_row = {
-                'date': pd.to_datetime(row.get('date')).date() if pd.notna(row.get('date')) else None,
-                'transaction': str(row.get('transaction', '')).strip(),
-                'description': str(row.get('description', '')).strip(),
-                'amount': float(row.get('amount', 0)) if pd.notna(row.get('amount')) else 0.0,
-                'balance': float(row.get('balance', 0)) if pd.notna(row.get('balance')) else None
-            }
-            rows.append(parsed_row)
+        out = pd.DataFrame(index=df.index)
+        out['date'] = _date_column(df['date'])
+        out['transaction'] = _text_column(df['transaction'])
+        out['description'] = _text_column(df['description'])
+        out['amount'] = pd.to_numeric(df['amount']).astype('float64').fillna(0.0)
+        out['balance'] = _float_column(df['balance'])
         
-        logger.info(f"Parsed {len(rows)} Wealthsimple transactions")
-        return rows 
\ No newline at end of file
+        logger.info(f"Parsed {len(out)} Wealthsimple transactions")
+        return out 
\ No newline at end of file
@@ -1,11 +1,32 @@
 import logging
-import json
-from typing import List, Dict, Any
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Dict, Any, Callable, Optional, TypedDict
 import google.generativeai as genai
-from google.cloud import secretmanager
+import orjson
+from cachetools import LRUCache
+from google.api_core.exceptions import ResourceExhausted, ServiceUnavailable
+
+from .secret_manager import get_secret
 
 logger = logging.getLogger(__name__)
 
+# Concurrent Gemini requests, kept under the API's per-minute request limit
+MAX_CONCURRENT_BATCHES = 8
+# Attempts per batch when Gemini answers 429 / 503
+MAX_ATTEMPTS = 4
+# Categorizations kept in-process per description key
+LOCAL_CACHE_SIZE = 10000
+
+class Categorization(TypedDict):
+    """One categorized description in Gemini's structured response"""
+    description_number: int
+    general_category: str
+    detailed_category: str
+    confidence_score: float
+
 class GeminiEnricher:
     """Handle transaction categorization using Gemini API"""
     
@@ -16,17 +37,28 @@ class GeminiEnricher:
         # Get API key from Secret Manager
         api_key = self._get_secret("gemini-api-key")
         genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel(self.model_name)
+        self.model = genai.GenerativeModel(
+            self.model_name,
+            generation_config=genai.GenerationConfig(
+                response_mime_type="application/json",
+                response_schema=List[Categorization]
+            )
+        )
         
         # Define category taxonomy
         self.category_taxonomy = self._get_category_taxonomy()
+        
+        # Static prompt prefix built once; only the descriptions change per batch
+        self._taxonomy_text = self._format_taxonomy(self.category_taxonomy)
+        self._prompt_prefix = self._create_prompt_prefix(self._taxonomy_text)
+        
+        # Results of earlier calls, so repeated descriptions skip Gemini
+        self._local_cache = LRUCache(maxsize=LOCAL_CACHE_SIZE)
+        self._local_cache_lock = threading.Lock()
     
     def _get_secret(self, secret_name: str) -> str:
         """Get secret from Google Secret Manager"""
-        client = secretmanager.SecretManagerServiceClient()
-        name = f"projects/{self.project_id}/secrets/{secret_name}/versions/latest"
-        response = client.access_secret_version(request={"name": name})
-        return response.payload.data.decode("UTF-8")
+        return get_secret(secret_name, self.project_id)
     
     def _get_category_taxonomy(self) -> Dict[str, List[str]]:
         """Define the category taxonomy from the categories.csv data"""
@@ -46,21 +78,50 @@ class GeminiEnricher:
             "Uncategorized": ["Uncategorized"]
         }
     
-    def categorize_descriptions(self, descriptions: List[str]) -> List[Dict[str, Any]]:
-        """Categorize a batch of transaction descriptions using Gemini"""
+    def categorize_descriptions(self, descriptions: List[str],
+                                on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> List[Dict[str, Any]]:
+        """Categorize a batch of transaction descriptions using Gemini
+        
+        If given, on_batch is called with each group of results as soon as it is ready.
+        """
         logger.info(f"Categorizing {len(descriptions)} descriptions with Gemini")
         
         if not descriptions:
             return []
         
-        # Process in batches to avoid token limits
+        # Categorize each description key once, reusing results from earlier calls
+        unique = {}
+        for desc in descriptions:
+            unique.setdefault(desc.upper().strip(), desc)
+        with self._local_cache_lock:
+            results_by_key = {key: self._local_cache[key] for key in unique if key in self._local_cache}
+        pending = [desc for key, desc in unique.items() if key not in results_by_key]
+        logger.info(f"{len(results_by_key)} of {len(unique)} unique descriptions found in local cache")
+        if on_batch is not None and results_by_key:
+            on_batch(list(results_by_key.values()))
+        
+        # Process in batches to avoid token limits, sending batches concurrently
         batch_size = 20
-        all_results = []
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(MAX_CONCURRENT_BATCHES, len(batches))) as executor:
+                futures = [executor.submit(self._categorize_batch, batch) for batch in batches]
+                for future in as_completed(futures):
+                    batch_results = future.result()
+                    for result in batch_results:
+                        results_by_key[result['description_key']] = result
+                    if on_batch is not None:
+                        on_batch(batch_results)
+            
+            # Leave zero-confidence fallbacks uncached so they are retried on the next call
+            with self._local_cache_lock:
+                for desc in pending:
+                    result = results_by_key.get(desc.upper().strip())
+                    if result is not None and not self._is_fallback(result):
+                        self._local_cache[result['description_key']] = result
         
-        for i in range(0, len(descriptions), batch_size):
-            batch = descriptions[i:i + batch_size]
-            batch_results = self._categorize_batch(batch)
-            all_results.extend(batch_results)
+        all_results = [results_by_key[key] for key in unique if key in results_by_key]
         
         logger.info(f"Successfully categorized {len(all_results)} descriptions")
         return all_results
@@ -72,7 +133,7 @@ class GeminiEnricher:
             prompt = self._create_categorization_prompt(descriptions)
             
             # Call Gemini
-            response = self.model.generate_content(prompt)
+            response = self._generate_with_retry(prompt)
             
             # Parse response
             results = self._parse_gemini_response(response.text, descriptions)
@@ -82,32 +143,48 @@ class GeminiEnricher:
         except Exception as e:
             logger.error(f"Error categorizing batch: {str(e)}", exc_info=True)
             # Return fallback categories
-            return [{
-                'description_key': desc.upper().strip(),
-                'original_description': desc,
-                'general_category': 'Uncategorized',
-                'detailed_category': 'Uncategorized',
-                'confidence_score': 0.0,
-                'gemini_model_version': self.model_name
-            } for desc in descriptions]
+            return self._fallback_results(descriptions)
     
-    def _create_categorization_prompt(self, descriptions: List[str]) -> str:
-        """Create a structured prompt for Gemini categorization"""
-        
-        # Format taxonomy for prompt
+    def _format_taxonomy(self, taxonomy: Dict[str, List[str]]) -> str:
+        """Format the category taxonomy for the prompt"""
         taxonomy_text = ""
-        for general_cat, detailed_cats in self.category_taxonomy.items():
+        for general_cat, detailed_cats in taxonomy.items():
             taxonomy_text += f"**{general_cat}:**\n"
             for detailed_cat in detailed_cats:
                 taxonomy_text += f"  - {detailed_cat}\n"
             taxonomy_text += "\n"
-        
-        # Format descriptions list
-        descriptions_text = ""
-        for i, desc in enumerate(descriptions, 1):
-            descriptions_text += f"{i}. {desc}\n"
-        
-        prompt = f"""
+        return taxonomy_text
+    
+    def _fallback_results(self, descriptions: List[str]) -> List[Dict[str, Any]]:
+        """Uncategorized results used when Gemini fails for a batch"""
+        return [{
+            'description_key': desc.upper().strip(),
+            'original_description': desc,
+            'general_category': 'Uncategorized',
+            'detailed_category': 'Uncategorized',
+            'confidence_score': 0.0,
+            'gemini_model_version': self.model_name
+        } for desc in descriptions]
+    
+    def _is_fallback(self, result: Dict[str, Any]) -> bool:
+        """Whether a result is an uncategorized zero-confidence fallback"""
+        return result['general_category'] == 'Uncategorized' and not result['confidence_score']
+    
+    def _generate_with_retry(self, prompt: str):
+        """Call Gemini, backing off exponentially on rate limiting and unavailability"""
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                return self.model.generate_content(prompt)
+            except (ResourceExhausted, ServiceUnavailable) as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = 2 ** attempt + random.random()
+                logger.warning(f"Gemini request failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+    
+    def _create_prompt_prefix(self, taxonomy_text: str) -> str:
+        """Create the static part of the prompt shared by every batch"""
+        return f"""
 You are a financial transaction categorizer. Categorize each transaction description into the most appropriate category from the provided taxonomy.
 
 **CATEGORY TAXONOMY:**
@@ -117,66 +194,42 @@ You are a financial transaction categorizer. Categorize each transaction descrip
 1. For each transaction description, choose the MOST SPECIFIC detailed category that fits
 2. If no specific category fits well, use the appropriate general category with "Uncategorized" as detailed
 3. Provide a confidence score (0.0-1.0) for each categorization
-4. Return your response as a JSON array with this exact format:
-
-```json
-[
-  {{
-    "description_number": 1,
-    "general_category": "Category Name",
-    "detailed_category": "Subcategory Name", 
-    "confidence_score": 0.85
-  }},
-  ...
-]
-```
+4. Return one entry per description, with description_number set to the description's number
 
 **TRANSACTION DESCRIPTIONS TO CATEGORIZE:**
-{descriptions_text}
-
-Respond ONLY with the JSON array, no additional text.
 """
-        
-        return prompt
+    
+    def _create_categorization_prompt(self, descriptions: List[str]) -> str:
+        """Create a structured prompt for Gemini categorization"""
+        # Keep the shared prefix first so every batch starts with identical tokens
+        descriptions_text = "".join(f"{i}. {desc}\n" for i, desc in enumerate(descriptions, 1))
+        return self._prompt_prefix + descriptions_text
     
     def _parse_gemini_response(self, response_text: str, original_descriptions: List[str]) -> List[Dict[str, Any]]:
-        """Parse Gemini response and create standardized results"""
+        """Parse Gemini's structured JSON response and create standardized results"""
         try:
-            # Extract JSON from response
-            response_text = response_text.strip()
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]
-            
-            # Parse JSON
-            categorizations = json.loads(response_text.strip())
-            
-            # Create standardized results
-            results = []
-            for i, cat in enumerate(categorizations):
-                if i < len(original_descriptions):
-                    desc = original_descriptions[i]
-                    result = {
-                        'description_key': desc.upper().strip(),
-                        'original_description': desc,
-                        'general_category': cat.get('general_category', 'Uncategorized'),
-                        'detailed_category': cat.get('detailed_category', 'Uncategorized'),
-                        'confidence_score': float(cat.get('confidence_score', 0.0)),
-                        'gemini_model_version': self.model_name
-                    }
-                    results.append(result)
-            
-            return results
-            
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+            categorizations = orjson.loads(response_text)
+        except orjson.JSONDecodeError as e:
             logger.error(f"Error parsing Gemini response: {str(e)}, Response: {response_text}")
             # Return fallback categories
-            return [{
+            return self._fallback_results(original_descriptions)
+        
+        # Match entries to descriptions by number rather than position
+        by_number = {cat['description_number']: cat for cat in categorizations}
+        results = []
+        for i, desc in enumerate(original_descriptions, 1):
+            cat = by_number.get(i)
+            if cat is None:
+                logger.warning(f"Gemini returned no category for description: {desc}")
+                results.extend(self._fallback_results([desc]))
+                continue
+            results.append({
                 'description_key': desc.upper().strip(),
                 'original_description': desc,
-                'general_category': 'Uncategorized',
-                'detailed_category': 'Uncategorized',
-                'confidence_score': 0.0,
+                'general_category': cat['general_category'],
+                'detailed_category': cat['detailed_category'],
+                'confidence_score': float(cat['confidence_score']),
                 'gemini_model_version': self.model_name
-            } for desc in original_descriptions] 
\ No newline at end of file
+            })
+        
+        return results
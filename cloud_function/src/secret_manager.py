@@ -0,0 +1,36 @@
+import logging
+import threading
+from typing import Optional
+from cachetools import TTLCache
+from google.cloud import secretmanager
+
+logger = logging.getLogger(__name__)
+
+# Shared client and payload cache so secret lookups skip gRPC channel setup
+_SECRET_CLIENT: Optional[secretmanager.SecretManagerServiceClient] = None
+_SECRET_CACHE: TTLCache = TTLCache(maxsize=64, ttl=300)
+_SECRET_LOCK = threading.Lock()
+
+def _get_client() -> secretmanager.SecretManagerServiceClient:
+    """Lazily create the process-wide Secret Manager client"""
+    global _SECRET_CLIENT
+    with _SECRET_LOCK:
+        if _SECRET_CLIENT is None:
+            _SECRET_CLIENT = secretmanager.SecretManagerServiceClient()
+        return _SECRET_CLIENT
+
+def get_secret(secret_name: str, project_id: str) -> str:
+    """Retrieve the latest version of a secret from Google Secret Manager"""
+    key = (project_id, secret_name)
+    with _SECRET_LOCK:
+        cached = _SECRET_CACHE.get(key)
+    if cached is not None:
+        return cached
+    
+    name = f"projects/{project_id}/secrets/{secret_name}/versions/latest"
+    response = _get_client().access_secret_version(request={"name": name})
+    secret = response.payload.data.decode("UTF-8")
+    
+    with _SECRET_LOCK:
+        _SECRET_CACHE[key] = secret
+    return secret
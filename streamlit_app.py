@@ -1,103 +1,242 @@
 import streamlit as st
 import polars as pl
 from google.cloud import storage
+from google.cloud.storage import transfer_manager
+from google.cloud.storage.retry import DEFAULT_RETRY
 from google.oauth2 import service_account
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import lru_cache
 import os
+import shutil
+import tempfile
 import requests
 import json
 
+# Concurrent background uploads
+MAX_UPLOAD_WORKERS = 8
+# Seconds between progress refreshes while uploads are pending
+UPLOAD_POLL_INTERVAL = 1
+
+# Files above this size are uploaded as concurrent chunks and composed server-side
+MULTIPART_THRESHOLD = 32 * 1024 * 1024
+MULTIPART_CHUNKSIZE = 16 * 1024 * 1024
+MAX_CONCURRENCY = 8
+# Per-request timeout in seconds for upload calls
+UPLOAD_TIMEOUT = 120
+
+# Retry transient upload errors with exponential backoff. Uploads overwrite the
+# same object with the same bytes, so retrying them unconditionally is safe.
+UPLOAD_RETRY = DEFAULT_RETRY.with_delay(initial=1.0, maximum=8.0, multiplier=2.0)
+
+# Content types set on uploaded statements, by file extension
+CONTENT_TYPES = {
+    ".csv": "text/csv",
+    ".xls": "application/vnd.ms-excel",
+    ".xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    ".xlsb": "application/vnd.ms-excel.sheet.binary.macroEnabled.12",
+}
+
+# GCS accepts at most 100 calls per batch request
+MAX_BATCH_SIZE = 100
+
+
+@lru_cache(maxsize=1)
+def _build_credentials():
+    """Build the service account credentials once per process, even if resource caches are cleared"""
+
+    # Create credentials from the service account info in secrets
+    return service_account.Credentials.from_service_account_info(
+        dict(st.secrets["connections"]["gcs"])
+    )
+
 
 # Initialize GCP Storage client
 @st.cache_resource
 def init_gcp_client():
     """Initialize and cache the GCP storage client using service account from secrets"""
+    return storage.Client(credentials=_build_credentials())
 
-    # Create credentials from the service account info in secrets
-    credentials_info = {
-        "type": st.secrets["connections"]["gcs"]["type"],
-        "project_id": st.secrets["connections"]["gcs"]["project_id"],
-        "private_key_id": st.secrets["connections"]["gcs"]["private_key_id"],
-        "private_key": st.secrets["connections"]["gcs"]["private_key"],
-        "client_email": st.secrets["connections"]["gcs"]["client_email"],
-        "client_id": st.secrets["connections"]["gcs"]["client_id"],
-        "auth_uri": st.secrets["connections"]["gcs"]["auth_uri"],
-        "token_uri": st.secrets["connections"]["gcs"]["token_uri"],
-        "auth_provider_x509_cert_url": st.secrets["connections"]["gcs"][
-            "auth_provider_x509_cert_url"
-        ],
-        "client_x509_cert_url": st.secrets["connections"]["gcs"][
-            "client_x509_cert_url"
-        ],
-        "universe_domain": st.secrets["connections"]["gcs"]["universe_domain"],
+
+@st.cache_resource
+def get_bucket(bucket_name="personal-finance-dashboard"):
+    """Get the cached bucket handle for the given bucket name"""
+    return init_gcp_client().bucket(bucket_name)
+
+
+@st.cache_resource
+def get_upload_pool():
+    """Get the shared thread pool that runs uploads in the background"""
+    return ThreadPoolExecutor(max_workers=MAX_UPLOAD_WORKERS)
+
+
+def _upload_blob(bucket, file_obj, institution, filename):
+    """Upload a file to its institution folder, raising on failure (safe to call from worker threads)"""
+    # Create institution-specific path: institution/timestamp_filename
+    blob_path = f"{institution}/{filename}"
+
+    blob = bucket.blob(blob_path)
+
+    if file_obj.size > MULTIPART_THRESHOLD:
+        # Chunked uploads read from a file on disk
+        file_obj.seek(0)
+        with tempfile.NamedTemporaryFile() as tmp:
+            shutil.copyfileobj(file_obj, tmp)
+            tmp.flush()
+            transfer_manager.upload_chunks_concurrently(
+                tmp.name,
+                blob,
+                chunk_size=MULTIPART_CHUNKSIZE,
+                max_workers=MAX_CONCURRENCY,
+                worker_type=transfer_manager.THREAD,
+                retry=UPLOAD_RETRY,
+                timeout=UPLOAD_TIMEOUT,
+            )
+    else:
+        # Streamed from the upload buffer without copying it first. With a known
+        # length the client sends files up to 8 MiB in a single multipart
+        # request; larger ones still go through a resumable session
+        blob.upload_from_file(
+            file_obj,
+            rewind=True,
+            size=file_obj.size,
+            content_type=CONTENT_TYPES.get(os.path.splitext(filename)[1].lower()),
+            checksum="crc32c",
+            retry=UPLOAD_RETRY,
+            timeout=UPLOAD_TIMEOUT,
+        )
+
+    return blob_path
+
+
+# Object fields the file views read from a listing
+FILE_LIST_FIELDS = "items(name,size,timeCreated),nextPageToken"
+
+# Column types of the bucket-wide file listing frame
+FILE_LIST_SCHEMA = {
+    "institution": pl.String,
+    "filename": pl.String,
+    "blob_name": pl.String,
+    "size": pl.Int64,
+    "created": pl.Datetime("us", "UTC"),
+}
+
+
+def _file_record(blob, filename):
+    """Listing entry for one blob"""
+    return {
+        "filename": filename,
+        "blob_name": blob.name,
+        "size": blob.size,
+        "created": blob.time_created,
     }
 
-    credentials = service_account.Credentials.from_service_account_info(
-        credentials_info
+
+@st.cache_data(ttl=30, show_spinner=False)
+def list_files_from_gcp(bucket_name="personal-finance-dashboard"):
+    """List files from GCP bucket as one frame, by institution with the newest uploads first"""
+    bucket = get_bucket(bucket_name)
+
+    columns = {name: [] for name in FILE_LIST_SCHEMA}
+
+    # List all files in the bucket, fetching only the fields used below
+    blobs = bucket.list_blobs(fields=FILE_LIST_FIELDS, page_size=1000)
+
+    for blob in blobs:
+        # Parse path: institution/filename
+        institution, sep, filename = blob.name.partition("/")
+        if not sep:
+            continue
+
+        columns["institution"].append(institution)
+        columns["filename"].append(filename)
+        columns["blob_name"].append(blob.name)
+        columns["size"].append(blob.size)
+        columns["created"].append(blob.time_created)
+
+    return pl.DataFrame(columns, schema=FILE_LIST_SCHEMA).sort(
+        "institution", "created", descending=[False, True], nulls_last=True
     )
-    return storage.Client(credentials=credentials)
 
 
-def upload_to_gcp(
-    file_obj,
-    institution,
-    filename,
-    bucket_name="personal-finance-dashboard",
-):
-    """Upload file to GCP bucket with institution-based organization"""
-    
-    try:
-        client = init_gcp_client()
-        bucket = client.bucket(bucket_name)
+@st.cache_data(ttl=30, show_spinner=False)
+def list_institutions_from_gcp(bucket_name="personal-finance-dashboard"):
+    """List institution folders in the GCP bucket without listing their files"""
+    bucket = get_bucket(bucket_name)
+    blobs = bucket.list_blobs(
+        delimiter="/", fields="prefixes,nextPageToken", page_size=1000
+    )
 
-        # Create institution-specific path: institution/timestamp_filename
-        blob_path = f"{institution}/{filename}"
+    # Prefixes are collected as the pages are consumed
+    for _ in blobs.pages:
+        pass
 
-        blob = bucket.blob(blob_path)
-        file_obj.seek(0)  # Reset file pointer
-        blob.upload_from_file(file_obj)
+    return sorted(prefix.rstrip("/") for prefix in blobs.prefixes)
 
-        return blob_path
-    except Exception as e:
-        st.error(f"Upload failed: {str(e)}")
-        return None
 
+@st.cache_data(ttl=30, show_spinner=False)
+def list_files_for_institution(institution, bucket_name="personal-finance-dashboard"):
+    """List the files in an institution folder of the GCP bucket"""
+    bucket = get_bucket(bucket_name)
+    prefix = f"{institution}/"
 
-def list_files_from_gcp(bucket_name="personal-finance-dashboard"):
-    """List files from GCP bucket grouped by institution"""
-    
-    try:
-        client = init_gcp_client()
-        bucket = client.bucket(bucket_name)
+    # The whole folder is listed, since GCS returns blobs in name order and
+    # the table shows the newest uploads first
+    blobs = bucket.list_blobs(prefix=prefix, fields=FILE_LIST_FIELDS, page_size=1000)
 
-        files_by_institution = {}
+    return [_file_record(blob, blob.name[len(prefix):]) for blob in blobs]
 
-        # List all files in the bucket
-        blobs = bucket.list_blobs()
 
-        for blob in blobs:
-            # Parse path: institution/filename
-            parts = blob.name.split("/")
-            if len(parts) >= 2:  # institution/filename
-                institution = parts[0]  # First part is institution
-                filename = "/".join(parts[1:])  # Rest is filename
+@st.cache_data(ttl=30, show_spinner=False)
+def get_files_table(institution, bucket_name="personal-finance-dashboard"):
+    """Build the file manager table for an institution (None when it has no files)"""
+    files = list_files_for_institution(institution, bucket_name)
+    if not files:
+        return None
 
-                if institution not in files_by_institution:
-                    files_by_institution[institution] = []
+    # Columns built directly from the listing, sorted newest upload first and
+    # formatted column-wise, plus a checkbox column for deletion
+    files_df = pl.DataFrame(
+        {
+            "filename": [f["filename"] for f in files],
+            "size": [f["size"] for f in files],
+            "created": [f["created"] for f in files],
+            "blob_name": [f["blob_name"] for f in files],
+        },
+        schema={
+            "filename": pl.String,
+            "size": pl.Int64,
+            "created": pl.Datetime("us", "UTC"),
+            "blob_name": pl.String,
+        },
+    ).sort("created", descending=True, nulls_last=True).select(
+        pl.lit(False).alias("Delete?"),
+        pl.col("filename").alias("Filename"),
+        (pl.col("size") / 1024).round(2).alias("Size (KB)"),
+        pl.col("created")
+        .dt.strftime("%Y-%m-%d %H:%M:%S")
+        .fill_null("Unknown")
+        .alias("Uploaded"),
+        pl.col("blob_name"),
+    )
+    return files_df
 
-                files_by_institution[institution].append(
-                    {
-                        "filename": filename,
-                        "blob_name": blob.name,
-                        "size": blob.size,
-                        "created": blob.time_created,
-                    }
-                )
 
-        return files_by_institution
-    except Exception as e:
-        st.error(f"Failed to list files: {str(e)}")
-        return {}
+def clear_listing_cache():
+    """Invalidate cached bucket listings after files are added or removed"""
+    list_files_from_gcp.clear()
+    list_institutions_from_gcp.clear()
+    list_files_for_institution.clear()
+    get_files_table.clear()
+
+
+def list_blob_names(bucket):
+    """List only the object names in the GCP bucket"""
+    return [
+        blob.name
+        for blob in bucket.list_blobs(fields="items(name),nextPageToken", page_size=1000)
+    ]
 
 
 def kebab_to_display(kebab_name):
@@ -105,27 +244,29 @@ def kebab_to_display(kebab_name):
     return kebab_name.replace("-", " ").title()
 
 
-def delete_file_from_gcp(blob_name, bucket_name="personal-finance-dashboard"):
-    """Delete file from GCP bucket"""
-    
+def delete_files_from_gcp(blob_names, bucket):
+    """Delete several files from GCP bucket with batched requests, raising on failure"""
     try:
-        client = init_gcp_client()
-        bucket = client.bucket(bucket_name)
-        blob = bucket.blob(blob_name)
-        blob.delete()
-        return True
-    except Exception as e:
-        st.error(f"Delete failed: {str(e)}")
-        return False
+        for start in range(0, len(blob_names), MAX_BATCH_SIZE):
+            with bucket.client.batch():
+                for blob_name in blob_names[start:start + MAX_BATCH_SIZE]:
+                    bucket.blob(blob_name).delete()
+    finally:
+        # Deletes earlier in a failed run may have succeeded
+        clear_listing_cache()
 
 
-def process_all_data():
+def process_all_data(bucket):
     """Trigger the Cloud Run data processing pipeline"""
     try:
-        # Get all files grouped by institution
-        files_by_institution = list_files_from_gcp()
+        # Get current file paths grouped by institution (names only, uncached)
+        paths_by_institution = defaultdict(list)
+        for blob_name in list_blob_names(bucket):
+            institution, sep, _ = blob_name.partition("/")
+            if sep:
+                paths_by_institution[institution].append(blob_name)
         
-        if not files_by_institution:
+        if not paths_by_institution:
             st.warning("No files to process!")
             return
         
@@ -140,7 +281,7 @@ def process_all_data():
             total_files_processed = 0
             
             # Process each institution separately
-            for institution, files in files_by_institution.items():
+            for institution, file_paths in paths_by_institution.items():
                 # Convert institution display name back to code
                 institution_code = institution.replace("-", "_").lower()
                 if institution_code == "american_express_credit_card":
@@ -148,8 +289,6 @@ def process_all_data():
                 elif institution_code == "wealthsimple_cash":
                     institution_code = "wealthsimple"
                 
-                file_paths = [file_info["blob_name"] for file_info in files]
-                
                 # Prepare request payload
                 payload = {
                     "institution": institution_code,
@@ -214,6 +353,10 @@ def render_file_upload_view():
         st.session_state["total_files"] = None
         st.session_state["upload_institution"] = None
 
+    # Show errors from the last finished upload batch
+    for message in st.session_state.pop("upload_errors", []):
+        st.error(message)
+
     # Form for file upload
     with st.form("upload_form"):
         # Financial Institution Dropdown
@@ -227,7 +370,7 @@ def render_file_upload_view():
         # File uploader with dynamic key to clear after successful upload
         uploaded_files = st.file_uploader(
             "Choose CSV or Excel files",
-            type=["csv", "xls", "xlsx"],
+            type=["csv", "xls", "xlsx", "xlsb"],
             accept_multiple_files=True,
             key=f"file_uploader_{st.session_state.upload_counter}",
         )
@@ -237,50 +380,28 @@ def render_file_upload_view():
         clear_button = st.form_submit_button("🗑️ Clear All Files", type="secondary")
 
         if process_button and uploaded_files:
-            progress_bar = st.progress(0)
-            status_text = st.empty()
-
-            uploaded_count = 0
-            total_files = len(uploaded_files)
-
-            for i, file in enumerate(uploaded_files):
-                status_text.text(f"Uploading {file.name}...")
-
-                # Upload to GCP
-                blob_path = upload_to_gcp(file, institution, file.name)
-
-                if blob_path:
-                    uploaded_count += 1
-                    # Add to session state log
-                    st.session_state.uploaded_files_log.append(
-                        {
-                            "institution": institution,
-                            "filename": file.name,
-                            "blob_path": blob_path,
-                            "upload_time": datetime.now(),
-                            "size": file.size,
-                        }
-                    )
-
-                # Update progress
-                progress_bar.progress((i + 1) / total_files)
-
-            status_text.empty()
-            progress_bar.empty()
-
-            if uploaded_count > 0:
-                st.session_state["uploaded_count"] = uploaded_count
-                st.session_state["total_files"] = total_files
-                st.session_state["upload_institution"] = institution
-                st.session_state["show_upload_toast"] = True
-
-                # Clear the file uploader by incrementing the counter
-                st.session_state.upload_counter += 1
-
-                # Brief pause to show success message, then rerun
-                st.rerun()
-            else:
-                st.error("❌ No files were uploaded successfully")
+            # Hand the uploads to the background pool and return to the UI;
+            # render_pending_uploads reports progress and results
+            bucket = get_bucket()
+            pool = get_upload_pool()
+            # One timestamp for the whole batch, logged for each of its files
+            batch_ts = datetime.now()
+            pending = st.session_state.setdefault("pending_uploads", [])
+            for file in uploaded_files:
+                pending.append(
+                    {
+                        "institution": institution,
+                        "file": file,
+                        "upload_time": batch_ts,
+                        "future": pool.submit(
+                            _upload_blob, bucket, file, institution, file.name
+                        ),
+                    }
+                )
+
+            # Clear the file uploader by incrementing the counter
+            st.session_state.upload_counter += 1
+            st.rerun()
 
         # Handle clear button
         if clear_button:
@@ -288,82 +409,130 @@ def render_file_upload_view():
             st.rerun()
 
 
+@st.fragment(run_every=UPLOAD_POLL_INTERVAL)
+def render_pending_uploads():
+    """Show progress of background uploads, refreshing until they all finish"""
+    pending = st.session_state.get("pending_uploads", [])
+    if not pending:
+        return
+
+    finished = sum(1 for upload in pending if upload["future"].done())
+    st.progress(
+        finished / len(pending), text=f"Uploading files... {finished}/{len(pending)}"
+    )
+    if finished < len(pending):
+        return
+
+    # Collect results on the script thread once the whole batch is done
+    errors = []
+    new_entries = []
+    for upload in pending:
+        file = upload["file"]
+        try:
+            blob_path = upload["future"].result()
+        except Exception as e:
+            errors.append(f"Upload failed for {file.name}: {str(e)}")
+            continue
+
+        new_entries.append(
+            {
+                "institution": upload["institution"],
+                "filename": file.name,
+                "blob_path": blob_path,
+                "upload_time": upload["upload_time"],
+                "size": file.size,
+            }
+        )
+
+    # Add the batch to the session state log in one write
+    st.session_state.uploaded_files_log.extend(new_entries)
+
+    uploaded_count = len(pending) - len(errors)
+    if uploaded_count > 0:
+        clear_listing_cache()
+        st.session_state["uploaded_count"] = uploaded_count
+        st.session_state["total_files"] = len(pending)
+        st.session_state["upload_institution"] = pending[-1]["institution"]
+        st.session_state["show_upload_toast"] = True
+    else:
+        errors.append("❌ No files were uploaded successfully")
+
+    st.session_state["upload_errors"] = errors
+    st.session_state["pending_uploads"] = []
+    st.rerun()
+
+
 def render_file_manager_view():
     """Render the file management interface"""
     st.header("📋 Manage Uploaded Files")
 
-    # Refresh button
+    # Refresh button; the click already reruns the script, and the listing
+    # below is read after the cache is cleared
     if st.button("🔄 Refresh File List"):
-        st.rerun()
+        clear_listing_cache()
+
+    # List institution folders only; files are listed for the selected one
+    try:
+        institutions = list_institutions_from_gcp()
+    except Exception as e:
+        st.error(f"Failed to list institutions: {str(e)}")
+        return
 
-    # Get files from GCP for current user
-    files_by_institution = list_files_from_gcp()
+    # Show delete success toast
+    if st.session_state.get("show_delete_toast"):
+        deleted_file = st.session_state.get("deleted_filename", "file")
+        st.toast(f"✅ Successfully deleted {deleted_file}")
+        st.session_state["show_delete_toast"] = False
+        st.session_state["deleted_filename"] = None
 
-    if not files_by_institution:
+    if not institutions:
         st.info("No files found in the storage bucket.")
-    else:
-        for institution, files in files_by_institution.items():
-            display_name = kebab_to_display(institution)
-            st.subheader(f"📊 {display_name}")
+        return
+
+    institution = st.radio(
+        "Institution", institutions, format_func=kebab_to_display, horizontal=True
+    )
+    try:
+        files_df = get_files_table(institution)
+    except Exception as e:
+        st.error(f"Failed to list files: {str(e)}")
+        return
 
-            if not files:
-                st.write("No files for this institution")
-                continue
+    display_name = kebab_to_display(institution)
+    st.subheader(f"📊 {display_name}")
 
-            # Add a header row for clarity
-            col1, col2, col3, col4 = st.columns([3, 1, 2, 0.5])
-            with col1:
-                st.markdown("**Filename**")
-            with col2:
-                st.markdown("**Size**")
-            with col3:
-                st.markdown("**Uploaded**")
-            with col4:
-                st.markdown("**Action**")
-            st.markdown("---")
-
-            # Display files with individual delete buttons for each row
-            for i, file_info in enumerate(files):
-                col1, col2, col3, col4 = st.columns([3, 1, 2, 0.5])
-
-                with col1:
-                    st.write(file_info["filename"])
-
-                with col2:
-                    st.write(f"{round(file_info['size'] / 1024, 2)} KB")
-
-                with col3:
-                    upload_time = (
-                        file_info["created"].strftime("%Y-%m-%d %H:%M:%S")
-                        if file_info["created"]
-                        else "Unknown"
-                    )
-                    st.write(upload_time)
-
-                with col4:
-                    # Trash icon button for each row
-                    if st.button(
-                        "🗑️",
-                        key=f"delete_{institution}_{i}",
-                        help=f"Delete {file_info['filename']}",
-                    ):
-                        blob_name = file_info["blob_name"]
-                        filename = file_info["filename"]
-                        if delete_file_from_gcp(blob_name):
-                            st.session_state["deleted_filename"] = filename
-                            st.session_state["show_delete_toast"] = True
-                            st.rerun()
-                        else:
-                            st.error(f"Failed to delete {filename}")
-
-            # Show delete success toast
-            if st.session_state.get("show_delete_toast"):
-                deleted_file = st.session_state.get("deleted_filename", "file")
-                st.toast(f"✅ Successfully deleted {deleted_file}")
-                st.session_state["show_delete_toast"] = False
-                st.session_state["deleted_filename"] = None
-
-            st.divider()
+    if files_df is None:
+        st.write("No files for this institution")
+        return
+
+    with st.form(f"delete_form_{institution}"):
+        edited_df = st.data_editor(
+            files_df,
+            num_rows="fixed",
+            disabled=["Filename", "Size (KB)", "Uploaded"],
+            column_config={"blob_name": None},
+            use_container_width=True,
+            hide_index=True,
+        )
+        delete_button = st.form_submit_button("🗑️ Delete Selected")
+
+    if delete_button:
+        selected_blob_names = edited_df.filter(pl.col("Delete?"))[
+            "blob_name"
+        ].to_list()
+        if not selected_blob_names:
+            st.warning("No files selected")
+            return
+
+        try:
+            delete_files_from_gcp(selected_blob_names, get_bucket())
+        except Exception as e:
+            st.error(f"Delete failed: {str(e)}")
+            return
+
+        st.session_state["deleted_filename"] = f"{len(selected_blob_names)} files"
+        st.session_state["show_delete_toast"] = True
+        st.rerun()
 
 
 def render_analytics_view():
@@ -379,20 +548,33 @@ def render_analytics_view():
     
     with col2:
         if st.button("🚀 Process Data", type="primary", help="Trigger data pipeline: parse files → load to BigQuery → run dbt → categorize with Gemini"):
-            process_all_data()
+            process_all_data(get_bucket())
 
     st.divider()
 
     # Get files for analysis for current user
-    files_by_institution = list_files_from_gcp()
+    try:
+        files_df = list_files_from_gcp()
+    except Exception as e:
+        st.error(f"Failed to list files: {str(e)}")
+        return
 
-    if not files_by_institution:
+    if files_df.is_empty():
         st.warning("No data available for analysis. Please upload some files first.")
         return
 
+    # Aggregate all files per institution in one pass
+    summary_df = files_df.group_by("institution", maintain_order=True).agg(
+        pl.len().alias("file_count"),
+        pl.col("size").sum().alias("total_size"),
+        # Listing is sorted newest first, so the ends are the latest/oldest
+        pl.col("created").first().alias("latest_upload"),
+        pl.col("created").drop_nulls().last().alias("oldest_upload"),
+    )
+
     # Summary cards
-    total_files = sum(len(files) for files in files_by_institution.values())
-    total_institutions = len(files_by_institution)
+    total_files = files_df.height
+    total_institutions = summary_df.height
 
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -401,9 +583,7 @@ def render_analytics_view():
         st.metric("Institutions", total_institutions)
     with col3:
         # Calculate total storage used
-        total_size = 0
-        for files in files_by_institution.values():
-            total_size += sum(f["size"] for f in files)
+        total_size = summary_df["total_size"].sum()
         st.metric("Storage Used", f"{total_size / (1024 * 1024):.1f} MB")
 
     st.divider()
@@ -411,33 +591,35 @@ def render_analytics_view():
     # Institution breakdown
     st.subheader("📈 Data by Institution")
 
-    for institution, files in files_by_institution.items():
+    # Split the listing once so each expander reads only its own files
+    files_by_institution = files_df.partition_by("institution", as_dict=True)
+
+    for summary in summary_df.iter_rows(named=True):
+        institution = summary["institution"]
+        files = files_by_institution[(institution,)]
         display_name = kebab_to_display(institution)
-        with st.expander(f"{display_name} ({len(files)} files)"):
-            if files:
-                # Create a simple analysis
-                total_size = sum(f["size"] for f in files)
-                latest_upload = max(f["created"] for f in files if f["created"])
-                oldest_upload = min(f["created"] for f in files if f["created"])
-
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.write(f"**Total Size:** {total_size / 1024:.1f} KB")
-                    st.write(f"**File Count:** {len(files)}")
-                with col2:
-                    st.write(
-                        f"**Latest Upload:** {latest_upload.strftime('%Y-%m-%d %H:%M') if latest_upload else 'N/A'}"
-                    )
-                    st.write(
-                        f"**Oldest Upload:** {oldest_upload.strftime('%Y-%m-%d %H:%M') if oldest_upload else 'N/A'}"
-                    )
-
-                # File list
-                st.write("**Files:**")
-                for file_info in files:
-                    st.write(
-                        f"• {file_info['filename']} ({file_info['size'] / 1024:.1f} KB)"
-                    )
+        with st.expander(f"{display_name} ({summary['file_count']} files)"):
+            latest_upload = summary["latest_upload"]
+            oldest_upload = summary["oldest_upload"]
+
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write(f"**Total Size:** {summary['total_size'] / 1024:.1f} KB")
+                st.write(f"**File Count:** {summary['file_count']}")
+            with col2:
+                st.write(
+                    f"**Latest Upload:** {latest_upload.strftime('%Y-%m-%d %H:%M') if latest_upload else 'N/A'}"
+                )
+                st.write(
+                    f"**Oldest Upload:** {oldest_upload.strftime('%Y-%m-%d %H:%M') if oldest_upload else 'N/A'}"
+                )
+
+            # File list
+            st.write("**Files:**")
+            for file_info in files.iter_rows(named=True):
+                st.write(
+                    f"• {file_info['filename']} ({file_info['size'] / 1024:.1f} KB)"
+                )
 
     st.divider()
 
@@ -516,6 +698,10 @@ if "uploaded_files_log" not in st.session_state:
 # Render sidebar navigation and get selected page
 selected_page = render_sidebar_navigation()
 
+# Poll background uploads on every page so they finish while navigating
+if st.session_state.get("pending_uploads"):
+    render_pending_uploads()
+
 # Render content based on navigation selection
 if selected_page == "📁 File Manager":
     # Create tabs for upload and manage